@@ -3,32 +3,93 @@
 Batch Processing Example
 
 Process multiple audio/video files and generate a report with fingerprints,
-tags, and similarity scores.
+tags, and similarity scores. Audio is decoded once per file with FFmpeg,
+which must be on PATH.
 
 Usage:
     python batch_processing.py /path/to/media/directory
     python batch_processing.py /path/to/media/directory --output report.json
+
+With --output, per-file results are streamed to report.files.jsonl (one
+JSON object per line) as they complete, and report.json holds the summary.
 """
 
+import os
 import sys
 import json
 import argparse
+import subprocess
+import multiprocessing as mp
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Dict, List, Any
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Any
+
+import numpy as np
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    import simsimd
+    HAS_SIMSIMD = True
+except ImportError:
+    HAS_SIMSIMD = False
 
 from kino_frequency import FrequencyAnalyzer, Fingerprinter, ContentTagger
 
 
-SUPPORTED_EXTENSIONS = {'.wav', '.mp3', '.flac', '.ogg', '.m4a', '.mp4', '.mkv', '.webm', '.avi'}
+# Rows of the similarity matrix scored at once by find_similar_content
+SIMILARITY_BLOCK_ROWS = 1024
+
+SUPPORTED_EXTENSIONS = frozenset({'.wav', '.mp3', '.flac', '.ogg', '.m4a', '.mp4', '.mkv', '.webm', '.avi'})
+
+
+# Per-worker analysis objects, built once by _init_worker
+_analyzer = None
+_fingerprinter = None
+_tagger = None
+_sample_rate = 44100
+
+
+def _init_worker(sample_rate: int = 44100) -> None:
+    """Create the analysis objects shared by every file a worker processes."""
+    global _analyzer, _fingerprinter, _tagger, _sample_rate
+    _sample_rate = sample_rate
+    _analyzer = FrequencyAnalyzer(sample_rate=sample_rate)
+    _fingerprinter = Fingerprinter()
+    _tagger = ContentTagger()
+
+
+def decode_audio(file_path: Path, sample_rate: int) -> np.ndarray:
+    """Decode the audio track of a media file to mono float32 samples with FFmpeg."""
+    output = subprocess.run(
+        [
+            "ffmpeg", "-v", "error",
+            "-i", str(file_path),
+            "-vn",                      # No video
+            "-f", "f32le",              # Raw 32-bit float PCM
+            "-ac", "1",                 # Mono
+            "-ar", str(sample_rate),    # Sample rate
+            "-",
+        ],
+        capture_output=True,
+    )
+    if output.returncode != 0:
+        raise RuntimeError(f"FFmpeg audio extraction failed: {output.stderr.decode(errors='replace')}")
+
+    return np.frombuffer(output.stdout, dtype=np.float32)
 
 
 def process_file(file_path: Path) -> Dict[str, Any]:
     """Process a single media file and return analysis results."""
 
-    analyzer = FrequencyAnalyzer(sample_rate=44100)
-    fingerprinter = Fingerprinter()
-    tagger = ContentTagger()
+    if _analyzer is None:
+        _init_worker()
+    analyzer, fingerprinter, tagger = _analyzer, _fingerprinter, _tagger
+    sample_rate = _sample_rate
 
     result = {
         "file": str(file_path),
@@ -38,8 +99,11 @@ def process_file(file_path: Path) -> Dict[str, Any]:
     }
 
     try:
+        # Decode once and share the samples between every analysis step
+        samples = decode_audio(file_path, sample_rate)
+
         # Frequency analysis
-        analysis = analyzer.analyze(str(file_path))
+        analysis = analyzer.analyze(samples)
         result["dominant_frequencies"] = [
             {"frequency": f.frequency, "magnitude": f.magnitude}
             for f in analysis.dominant_frequencies[:5]
@@ -49,7 +113,7 @@ def process_file(file_path: Path) -> Dict[str, Any]:
         result["spectral_flatness"] = analysis.spectral_flatness
 
         # Fingerprint
-        fingerprint = fingerprinter.fingerprint(str(file_path))
+        fingerprint = fingerprinter.fingerprint(samples, sample_rate)
         result["fingerprint"] = {
             "hash": fingerprint.hash,
             "duration_secs": fingerprint.duration_secs,
@@ -57,14 +121,14 @@ def process_file(file_path: Path) -> Dict[str, Any]:
         }
 
         # Tags
-        tags = tagger.predict(str(file_path))
+        tags = tagger.predict(samples, sample_rate)
         result["tags"] = [
             {"name": t.name, "category": t.category, "confidence": t.confidence}
             for t in tags
         ]
 
         # Signature for similarity
-        signature = analyzer.compute_signature(str(file_path))
+        signature = analyzer.compute_signature(samples)
         result["signature"] = {
             "mel_bands": signature.mel_bands,
             "mfcc": signature.mfcc,
@@ -78,45 +142,70 @@ def process_file(file_path: Path) -> Dict[str, Any]:
     return result
 
 
-def find_similar_content(results: List[Dict[str, Any]], threshold: float = 0.7) -> List[Dict[str, Any]]:
-    """Find similar content pairs based on frequency signatures."""
+def find_media_files(directory: Path) -> Iterator[Path]:
+    """Walk a directory tree for supported media files, skipping hidden directories."""
+    for root, dirs, files in os.walk(directory, followlinks=False):
+        dirs[:] = [d for d in dirs if not d.startswith('.')]
+        for name in files:
+            dot = name.rfind('.')
+            if dot > 0 and name[dot:].lower() in SUPPORTED_EXTENSIONS:
+                yield Path(root, name)
 
-    similar_pairs = []
 
-    for i, r1 in enumerate(results):
-        if not r1["success"] or "signature" not in r1:
-            continue
+def cosine_similarity_rows(mels: np.ndarray, start: int, stop: int) -> np.ndarray:
+    """Cosine similarity of rows start:stop against rows start: of a float32 matrix.
+
+    Without simsimd the rows of ``mels`` must already be unit length.
+    """
+    if HAS_SIMSIMD:
+        return 1.0 - np.asarray(simsimd.cdist(mels[start:stop], mels[start:], metric="cosine"))
 
-        for j, r2 in enumerate(results[i+1:], i+1):
-            if not r2["success"] or "signature" not in r2:
-                continue
+    return mels[start:stop] @ mels[start:].T
 
-            # Compute cosine similarity between mel bands
-            mel1 = r1["signature"]["mel_bands"]
-            mel2 = r2["signature"]["mel_bands"]
 
-            if len(mel1) == len(mel2) and len(mel1) > 0:
-                dot = sum(a * b for a, b in zip(mel1, mel2))
-                norm1 = sum(a * a for a in mel1) ** 0.5
-                norm2 = sum(a * a for a in mel2) ** 0.5
+def find_similar_content(names: List[str], mels: np.ndarray, threshold: float = 0.7) -> List[Dict[str, Any]]:
+    """Find similar content pairs from a matrix of mel-band signatures, one row per file."""
 
-                if norm1 > 0 and norm2 > 0:
-                    similarity = dot / (norm1 * norm2)
+    nonzero = np.linalg.norm(mels, axis=1) > 0
+    names = [name for name, keep in zip(names, nonzero) if keep]
+    mels = mels[nonzero]
+    if len(names) < 2:
+        return []
 
-                    if similarity >= threshold:
-                        similar_pairs.append({
-                            "file1": r1["name"],
-                            "file2": r2["name"],
-                            "similarity": round(similarity, 4),
-                        })
+    if not HAS_SIMSIMD:
+        mels = mels / np.linalg.norm(mels, axis=1, keepdims=True)
+
+    # Score the upper triangle in row blocks so peak memory stays at
+    # SIMILARITY_BLOCK_ROWS x N rather than N x N
+    similar_pairs = []
+    for start in range(0, len(names), SIMILARITY_BLOCK_ROWS):
+        stop = min(start + SIMILARITY_BLOCK_ROWS, len(names))
+        block = cosine_similarity_rows(mels, start, stop)
+        rows, cols = np.nonzero(block >= threshold)
+        upper = cols > rows
+        rows, cols = rows[upper], cols[upper]
+        scores = block[rows, cols]
+        similar_pairs.extend(
+            {"file1": names[start + i], "file2": names[start + j], "similarity": round(float(v), 4)}
+            for i, j, v in zip(rows.tolist(), cols.tolist(), scores.tolist())
+        )
 
     return sorted(similar_pairs, key=lambda x: -x["similarity"])
 
 
+def dumps(obj: Any, indent: bool = False) -> bytes:
+    """Serialize to JSON bytes, using orjson when it is installed."""
+    if HAS_ORJSON:
+        option = orjson.OPT_SERIALIZE_NUMPY | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, option=option)
+    return json.dumps(obj, indent=2 if indent else None).encode()
+
+
 def main():
     parser = argparse.ArgumentParser(description="Batch process media files for frequency analysis")
     parser.add_argument("directory", help="Directory containing media files")
-    parser.add_argument("--output", "-o", help="Output JSON file for results")
+    parser.add_argument("--output", "-o", help="Output JSON file for the summary; "
+                        "per-file results are streamed alongside it as <stem>.files.jsonl")
     parser.add_argument("--workers", "-w", type=int, default=4, help="Number of parallel workers")
     parser.add_argument("--similarity-threshold", "-t", type=float, default=0.7,
                         help="Similarity threshold for finding duplicates (0.0-1.0)")
@@ -128,7 +217,7 @@ def main():
         sys.exit(1)
 
     # Find all supported media files
-    files = [f for f in directory.rglob("*") if f.suffix.lower() in SUPPORTED_EXTENSIONS]
+    files = list(find_media_files(directory))
 
     if not files:
         print(f"No supported media files found in {directory}")
@@ -137,23 +226,58 @@ def main():
     print(f"Found {len(files)} media files to process")
     print("-" * 50)
 
-    # Process files in parallel
-    results = []
-    with ThreadPoolExecutor(max_workers=args.workers) as executor:
-        futures = {executor.submit(process_file, f): f for f in files}
-
-        for i, future in enumerate(as_completed(futures), 1):
-            file_path = futures[future]
-            result = future.result()
-            results.append(result)
-
-            status = "✓" if result["success"] else "✗"
-            print(f"[{i}/{len(files)}] {status} {file_path.name}")
+    # Per-file results are written out as they complete; only the names and
+    # mel-band signatures are kept in memory for the similarity search
+    # The extra ".files" keeps the stream distinct from the summary, even for -o x.jsonl
+    output = Path(args.output) if args.output else None
+    results_path = output.with_name(output.stem + ".files.jsonl") if output else None
+    sink = open(results_path, "wb") if results_path else None
+    successful = 0
+    names = []
+    mels = None
+
+    # Process files in parallel; worker processes avoid GIL contention on the
+    # Python-side result building. forkserver is not available on Windows.
+    start_method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+    try:
+        with ProcessPoolExecutor(
+            max_workers=args.workers,
+            mp_context=mp.get_context(start_method),
+            initializer=_init_worker,
+            initargs=(44100,),
+        ) as executor:
+            futures = {executor.submit(process_file, f): f for f in files}
+
+            for i, future in enumerate(as_completed(futures), 1):
+                file_path = futures[future]
+                result = future.result()
+
+                if result["success"]:
+                    successful += 1
+                    mel_bands = result["signature"]["mel_bands"]
+                    if mels is None and len(mel_bands) > 0:
+                        mels = np.empty((len(files), len(mel_bands)), dtype=np.float32)
+                    # Signatures are compared as rows of one matrix, so they must share a length
+                    if mels is not None and len(mel_bands) == mels.shape[1]:
+                        mels[len(names)] = mel_bands
+                        names.append(result["name"])
+
+                if sink:
+                    sink.write(dumps(result) + b"\n")
+
+                status = "✓" if result["success"] else "✗"
+                print(f"[{i}/{len(files)}] {status} {file_path.name}")
+    finally:
+        if sink:
+            sink.close()
 
     # Find similar content
     print("\n" + "-" * 50)
     print("Finding similar content...")
-    similar = find_similar_content(results, args.similarity_threshold)
+    if mels is not None:
+        similar = find_similar_content(names, mels[:len(names)], args.similarity_threshold)
+    else:
+        similar = []
 
     if similar:
         print(f"\nFound {len(similar)} similar pairs:")
@@ -165,17 +289,18 @@ def main():
     # Generate report
     report = {
         "total_files": len(files),
-        "successful": sum(1 for r in results if r["success"]),
-        "failed": sum(1 for r in results if not r["success"]),
+        "successful": successful,
+        "failed": len(files) - successful,
         "similar_pairs": similar,
-        "files": results,
+        "files": str(results_path) if results_path else None,
     }
 
     # Save or print report
     if args.output:
-        with open(args.output, 'w') as f:
-            json.dump(report, f, indent=2)
+        with open(args.output, 'wb') as f:
+            f.write(dumps(report, indent=True))
         print(f"\nReport saved to: {args.output}")
+        print(f"Per-file results: {results_path}")
     else:
         print(f"\nSummary:")
         print(f"  Processed: {report['successful']}/{report['total_files']} files")
@@ -14,11 +14,50 @@ Or copy cells individually into notebook.
 # Cell 1: Imports and Setup
 # =========================
 
+import os
+import math
 import numpy as np
 import matplotlib.pyplot as plt
 from IPython.display import display, HTML, Audio
 from ipywidgets import interact, FloatSlider, IntSlider, Dropdown
 
+try:
+    import scipy.fft
+    import scipy.signal
+    HAS_SCIPY = True
+except ImportError:
+    HAS_SCIPY = False
+
+# Use the fastest available FFT backend: pyFFTW (with plan cache), then
+# multithreaded scipy.fft, then NumPy
+try:
+    import pyfftw
+    pyfftw.interfaces.cache.enable()
+    pyfftw.interfaces.cache.set_keepalive_time(60)
+
+    def rfft(samples: np.ndarray) -> np.ndarray:
+        return pyfftw.interfaces.numpy_fft.rfft(samples, threads=os.cpu_count())
+except ImportError:
+    if HAS_SCIPY:
+        def rfft(samples: np.ndarray) -> np.ndarray:
+            return scipy.fft.rfft(samples, workers=-1)
+    else:
+        rfft = np.fft.rfft
+
+# libsndfile handles the float -> PCM16 conversion in C when available
+try:
+    import soundfile as sf
+    HAS_SOUNDFILE = True
+except ImportError:
+    HAS_SOUNDFILE = False
+
+# Numba compiles the note-labeling helpers when available
+try:
+    import numba
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
 # Attempt to import psm_frequency
 try:
     from kino_frequency import FrequencyAnalyzer, Fingerprinter, ContentTagger
@@ -37,21 +76,39 @@ def generate_test_signal(
     sample_rate: int = 44100,
 ) -> np.ndarray:
     """Generate a test signal with multiple frequency components."""
+    f = np.asarray(frequencies, dtype=np.float64)[:, None]
+    a = np.asarray(amplitudes, dtype=np.float64)
     t = np.linspace(0, duration, int(sample_rate * duration), endpoint=False)
-    signal = np.zeros_like(t)
 
-    for freq, amp in zip(frequencies, amplitudes):
-        signal += amp * np.sin(2 * np.pi * freq * t)
+    # Sum all components at once: (K,) @ (K, N) -> (N,). Time and phase stay
+    # in float64 for accuracy; only the mixed signal is cast to float32.
+    signal = a @ np.sin((2 * np.pi * f) * t)
 
     # Normalize
     signal = signal / np.max(np.abs(signal)) * 0.8
     return signal.astype(np.float32)
 
 
+def write_wav(path: str, signal: np.ndarray, sample_rate: int = 44100):
+    """Write a mono float signal to a 16-bit PCM WAV file."""
+    if HAS_SOUNDFILE:
+        sf.write(path, signal.astype(np.float32), sample_rate, subtype='PCM_16')
+        return
+
+    import wave
+
+    with wave.open(path, 'w') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes((signal * 32767).astype(np.int16).tobytes())
+
+
 def plot_spectrum(samples: np.ndarray, sample_rate: int = 44100, title: str = "Frequency Spectrum"):
     """Plot the frequency spectrum of a signal."""
     n = len(samples)
-    fft = np.fft.rfft(samples * np.hanning(n))
+    samples = np.asarray(samples, dtype=np.float32)
+    fft = rfft(samples * np.hanning(n).astype(np.float32))
     freqs = np.fft.rfftfreq(n, 1/sample_rate)
     magnitude = np.abs(fft) / n
 
@@ -79,7 +136,17 @@ def plot_spectrum(samples: np.ndarray, sample_rate: int = 44100, title: str = "F
 def plot_spectrogram(samples: np.ndarray, sample_rate: int = 44100, title: str = "Spectrogram"):
     """Plot a spectrogram of the signal."""
     plt.figure(figsize=(12, 4))
-    plt.specgram(samples, Fs=sample_rate, cmap='magma', NFFT=2048, noverlap=1024)
+    if HAS_SCIPY:
+        # One batched STFT over all frames instead of specgram's per-call setup
+        with scipy.fft.set_workers(-1):
+            f, t, Z = scipy.signal.stft(
+                samples, fs=sample_rate, nperseg=2048, noverlap=1024, return_onesided=True
+            )
+        visible = f <= 8000
+        plt.pcolormesh(t, f[visible], 20 * np.log10(np.abs(Z[visible]) + 1e-10),
+                       cmap='magma', shading='gouraud')
+    else:
+        plt.specgram(samples, Fs=sample_rate, cmap='magma', NFFT=2048, noverlap=1024)
     plt.colorbar(label='dB')
     plt.xlabel('Time (s)')
     plt.ylabel('Frequency (Hz)')
@@ -121,7 +188,7 @@ def interactive_signal_demo():
 
         # Spectrum
         n = len(signal)
-        fft = np.fft.rfft(signal * np.hanning(n))
+        fft = rfft(signal * np.hanning(n).astype(np.float32))
         freqs = np.fft.rfftfreq(n, 1/44100)
         magnitude = np.abs(fft) / n
 
@@ -161,17 +228,11 @@ def psm_analysis_demo():
 
     # Save as temporary WAV for analysis
     import tempfile
-    import wave
 
     with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as f:
         temp_path = f.name
 
-    # Write WAV file
-    with wave.open(temp_path, 'w') as wav:
-        wav.setnchannels(1)
-        wav.setsampwidth(2)
-        wav.setframerate(44100)
-        wav.writeframes((signal * 32767).astype(np.int16).tobytes())
+    write_wav(temp_path, signal)
 
     # Analyze with Kino
     analyzer = FrequencyAnalyzer(sample_rate=44100)
@@ -202,30 +263,67 @@ def psm_analysis_demo():
     plot_spectrum(signal, title="C Major Chord Spectrum")
 
     # Cleanup
-    import os
     os.unlink(temp_path)
 
     return signal
 
 
-def frequency_to_note(freq: float) -> str:
-    """Convert frequency to musical note."""
-    if freq <= 0:
-        return "--"
+NOTE_NAMES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+
+
+def _freq_to_midi(freq):
+    """MIDI note number nearest to a frequency (A4 = 440 Hz = 69)."""
+    return int(round(12 * math.log2(freq / 440.0) + 69))
+
+
+def _freqs_to_midi_np(freqs):
+    """Vectorized _freq_to_midi; non-positive frequencies map to -1."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        midi = np.rint(12 * np.log2(freqs / np.float32(440.0)) + 69)
+    return np.where(freqs > 0, midi, -1).astype(np.int32)
+
+
+if HAS_NUMBA:
+    _freq_to_midi = numba.njit(cache=True)(_freq_to_midi)
+
+    @numba.vectorize(['int32(float32)'], target='parallel')
+    def _freqs_to_midi_nb(freq):
+        if freq <= 0:
+            return -1
+        return round(12 * math.log2(freq / 440.0) + 69)
 
-    notes = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
-    a4 = 440.0
+    _freqs_to_midi = _freqs_to_midi_nb
+else:
+    _freqs_to_midi = _freqs_to_midi_np
 
-    semitones = 12 * np.log2(freq / a4)
-    midi = int(round(semitones + 69))
 
+def _note_name(freq: float, midi: int) -> str:
     if midi < 0 or midi > 127:
         return f"{freq:.0f}Hz"
 
     note_idx = midi % 12
     octave = (midi // 12) - 1
 
-    return f"{notes[note_idx]}{octave}"
+    return f"{NOTE_NAMES[note_idx]}{octave}"
+
+
+def frequency_to_note(freq: float) -> str:
+    """Convert frequency to musical note."""
+    if freq <= 0:
+        return "--"
+
+    return _note_name(freq, _freq_to_midi(freq))
+
+
+def frequency_to_note_batch(freqs: np.ndarray) -> list[str]:
+    """Convert an array of frequencies to musical notes."""
+    freqs = np.asarray(freqs, dtype=np.float32)
+    midi = _freqs_to_midi(freqs)
+
+    return [
+        _note_name(f, m) if f > 0 else "--"
+        for f, m in zip(freqs.tolist(), midi.tolist())
+    ]
 
 
 # Cell 5: Fingerprint Comparison Demo
@@ -239,7 +337,6 @@ def fingerprint_demo():
         return
 
     import tempfile
-    import wave
 
     # Generate original signal
     original = generate_test_signal(
@@ -273,11 +370,7 @@ def fingerprint_demo():
     for name, sig in signals.items():
         with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as f:
             temp_files[name] = f.name
-            with wave.open(f.name, 'w') as wav:
-                wav.setnchannels(1)
-                wav.setsampwidth(2)
-                wav.setframerate(44100)
-                wav.writeframes((sig * 32767).astype(np.int16).tobytes())
+        write_wav(temp_files[name], sig)
 
     # Generate fingerprints
     fingerprinter = Fingerprinter()
@@ -303,14 +396,17 @@ def fingerprint_demo():
     print("\n\nSimilarity Scores (vs original):")
     print("-" * 40)
 
-    orig_mel = np.array(signatures['original'].mel_bands)
+    # Normalize each signature once; the similarity matrix is then one matmul
+    names = list(signatures)
+    mel_mat = np.stack([np.asarray(s.mel_bands, dtype=np.float32) for s in signatures.values()])
+    mel_mat /= np.linalg.norm(mel_mat, axis=1, keepdims=True) + 1e-12
+    similarity = mel_mat @ mel_mat.T
+
+    orig_idx = names.index('original')
     for name in ['noisy', 'pitch_shifted', 'different']:
-        other_mel = np.array(signatures[name].mel_bands)
-        similarity = np.dot(orig_mel, other_mel) / (np.linalg.norm(orig_mel) * np.linalg.norm(other_mel))
-        print(f"  {name:15}: {similarity:.1%}")
+        print(f"  {name:15}: {similarity[orig_idx, names.index(name)]:.1%}")
 
     # Cleanup
-    import os
     for path in temp_files.values():
         os.unlink(path)
 
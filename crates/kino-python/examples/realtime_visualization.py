@@ -7,6 +7,7 @@ spectrum visualization using matplotlib.
 
 Requirements:
     pip install sounddevice matplotlib
+    pip install pyfftw  # optional, faster FFTs (scipy is used if present)
 
 Usage:
     python realtime_visualization.py
@@ -26,6 +27,19 @@ except ImportError:
     print("  pip install sounddevice matplotlib")
     sys.exit(1)
 
+# Optional faster FFT backends
+try:
+    import pyfftw
+    HAS_PYFFTW = True
+except ImportError:
+    HAS_PYFFTW = False
+
+try:
+    import scipy.fft
+    HAS_SCIPY = True
+except ImportError:
+    HAS_SCIPY = False
+
 from kino_frequency import FrequencyAnalyzer
 
 
@@ -37,8 +51,9 @@ class RealtimeVisualizer:
         self.fft_size = fft_size
         self.device = device
 
-        # Audio buffer
-        self.buffer = np.zeros(fft_size)
+        # Circular audio buffer; write_idx marks the oldest sample
+        self.buffer = np.zeros(fft_size, dtype=np.float32)
+        self.write_idx = 0
 
         # Frequency analyzer
         self.analyzer = FrequencyAnalyzer(sample_rate=sample_rate, fft_size=fft_size)
@@ -46,9 +61,39 @@ class RealtimeVisualizer:
         # Frequency axis for plotting
         self.freqs = np.fft.rfftfreq(fft_size, 1/sample_rate)
 
-        # Magnitude history for spectrogram
+        # Band boundaries as bin indices; empty bands (above Nyquist) stay at zero
+        band_edges = [20, 60, 250, 500, 2000, 4000, 6000, 20000]
+        band_idx = np.searchsorted(self.freqs, band_edges)
+        band_widths = np.diff(band_idx)
+        self.band_nonempty = band_widths > 0
+        self.band_starts = band_idx[:-1][self.band_nonempty]
+        self.band_widths = band_widths[self.band_nonempty]
+        self.band_end = band_idx[-1]
+        self.band_energies = np.zeros(len(band_widths), dtype=np.float32)
+
+        # Plan the FFT once up front; every frame reuses the same aligned buffer
+        if HAS_PYFFTW:
+            self.fft_input = pyfftw.empty_aligned(fft_size, dtype='float32')
+            self.fft_plan = pyfftw.builders.rfft(
+                self.fft_input, threads=2, planner_effort='FFTW_MEASURE'
+            )
+
+        # Window and scratch buffers reused by every frame
+        self.window = np.hanning(fft_size).astype(np.float32)
+        self.scratch = self.fft_input if HAS_PYFFTW else np.empty(fft_size, dtype=np.float32)
+        self.mag = np.empty(fft_size // 2 + 1, dtype=np.float32)
+        self.mag_norm = np.empty_like(self.mag)
+
+        # Magnitude history for spectrogram, limited to the displayed bins.
+        # Stored column-major (bins x time) and twice as wide as the history:
+        # every column is written twice, so the last history_length columns
+        # are always a contiguous, chronologically ordered view.
         self.history_length = 100
-        self.magnitude_history = np.zeros((self.history_length, len(self.freqs)))
+        self.spectrogram_bins = min(500, len(self.freqs))
+        self.magnitude_history = np.zeros(
+            (self.spectrogram_bins, 2 * self.history_length), dtype=np.float32, order='F'
+        )
+        self.history_idx = 0
 
         # Setup plot
         self.setup_plot()
@@ -85,7 +130,7 @@ class RealtimeVisualizer:
         # Spectrogram
         self.ax_spectrogram = self.axes[2]
         self.spectrogram_img = self.ax_spectrogram.imshow(
-            self.magnitude_history.T[:500, :],  # Show up to ~10kHz
+            self.history_view(),  # Show up to ~10kHz
             aspect='auto',
             origin='lower',
             cmap='magma',
@@ -99,39 +144,71 @@ class RealtimeVisualizer:
 
         plt.tight_layout()
 
+    def history_view(self) -> np.ndarray:
+        """Spectrogram history, oldest column first, without copying."""
+        start = self.history_idx
+        return self.magnitude_history[:, start:start + self.history_length]
+
+    def rfft(self, samples: np.ndarray) -> np.ndarray:
+        """Real FFT of one buffer using the fastest available backend."""
+        if HAS_PYFFTW:
+            if samples is not self.fft_input:
+                self.fft_input[:] = samples
+            return self.fft_plan()
+        if HAS_SCIPY:
+            return scipy.fft.rfft(samples, workers=-1)
+        return np.fft.rfft(samples)
+
     def audio_callback(self, indata, frames, time, status):
         """Callback for audio input stream."""
         if status:
             print(f"Audio status: {status}")
 
-        # Update buffer with new samples
-        self.buffer = np.roll(self.buffer, -frames)
-        self.buffer[-frames:] = indata[:, 0]
+        # Write new samples at the ring buffer position, wrapping at the end
+        samples = indata[-self.fft_size:, 0]
+        n = len(samples)
+        start = self.write_idx
+        end = start + n
+        if end <= self.fft_size:
+            self.buffer[start:end] = samples
+        else:
+            split = self.fft_size - start
+            self.buffer[start:] = samples[:split]
+            self.buffer[:end - self.fft_size] = samples[split:]
+        self.write_idx = end % self.fft_size
 
     def update_plot(self, frame):
         """Update the visualization."""
         # Compute FFT
-        windowed = self.buffer * np.hanning(len(self.buffer))
-        fft = np.fft.rfft(windowed)
-        magnitude = np.abs(fft) / len(self.buffer)
-
-        # Normalize for display
-        magnitude_db = 20 * np.log10(magnitude + 1e-10)
-        magnitude_norm = np.clip((magnitude_db + 80) / 80, 0, 1)
+        # Window the ring buffer oldest-first without linearizing it
+        start = self.write_idx
+        split = self.fft_size - start
+        np.multiply(self.buffer[start:], self.window[:split], out=self.scratch[:split])
+        np.multiply(self.buffer[:start], self.window[split:], out=self.scratch[split:])
+        fft = self.rfft(self.scratch)
+        np.abs(fft, out=self.mag)
+        self.mag *= 1.0 / self.fft_size
+
+        # Normalize for display: clip((20 * log10(mag) + 80) / 80, 0, 1)
+        self.mag += 1e-10
+        np.log10(self.mag, out=self.mag)
+        self.mag *= 0.25
+        self.mag += 1.0
+        magnitude_norm = np.clip(self.mag, 0, 1, out=self.mag_norm)
 
         # Update spectrum line
         self.spectrum_line.set_data(self.freqs, magnitude_norm)
 
-        # Find peaks (dominant frequencies)
-        peak_indices = []
-        for i in range(1, len(magnitude_norm) - 1):
-            if magnitude_norm[i] > magnitude_norm[i-1] and magnitude_norm[i] > magnitude_norm[i+1]:
-                if magnitude_norm[i] > 0.3:  # Threshold
-                    peak_indices.append(i)
+        # Find peaks (dominant frequencies): local maxima above the threshold
+        mid = magnitude_norm[1:-1]
+        mask = (mid > magnitude_norm[:-2]) & (mid > magnitude_norm[2:]) & (mid > 0.3)
+        peak_indices = np.nonzero(mask)[0] + 1
 
         # Keep top 5 peaks
-        peak_indices = sorted(peak_indices, key=lambda i: magnitude_norm[i], reverse=True)[:5]
-        if peak_indices:
+        if len(peak_indices) > 5:
+            peak_indices = peak_indices[np.argpartition(-magnitude_norm[peak_indices], 5)[:5]]
+        peak_indices = peak_indices[np.argsort(-magnitude_norm[peak_indices])]
+        if len(peak_indices):
             peak_freqs = self.freqs[peak_indices]
             peak_mags = magnitude_norm[peak_indices]
             self.peak_scatter.set_offsets(np.column_stack([peak_freqs, peak_mags]))
@@ -139,21 +216,21 @@ class RealtimeVisualizer:
             self.peak_scatter.set_offsets(np.empty((0, 2)))
 
         # Compute band energies
-        band_limits = [(20, 60), (60, 250), (250, 500), (500, 2000), (2000, 4000), (4000, 6000), (6000, 20000)]
-        band_energies = []
-        for low, high in band_limits:
-            mask = (self.freqs >= low) & (self.freqs < high)
-            energy = np.mean(magnitude_norm[mask]) if np.any(mask) else 0
-            band_energies.append(energy)
+        sums = np.add.reduceat(magnitude_norm[:self.band_end], self.band_starts)
+        self.band_energies[self.band_nonempty] = sums / self.band_widths
+        band_energies = self.band_energies
 
         # Update band bars
         for bar, energy in zip(self.band_bars, band_energies):
             bar.set_height(energy)
 
         # Update spectrogram history
-        self.magnitude_history = np.roll(self.magnitude_history, -1, axis=0)
-        self.magnitude_history[-1, :] = magnitude_norm
-        self.spectrogram_img.set_array(self.magnitude_history.T[:500, :])
+        col = self.history_idx
+        latest = magnitude_norm[:self.spectrogram_bins]
+        self.magnitude_history[:, col] = latest
+        self.magnitude_history[:, col + self.history_length] = latest
+        self.history_idx = (col + 1) % self.history_length
+        self.spectrogram_img.set_data(self.history_view())
 
         return [self.spectrum_line, self.peak_scatter, *self.band_bars, self.spectrogram_img]
 
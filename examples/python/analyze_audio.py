@@ -14,10 +14,14 @@ Usage:
     python analyze_audio.py input.wav --fingerprint
 """
 
+from __future__ import annotations
+
 import argparse
+import functools
+import hashlib
+import json
 import sys
 import wave
-import struct
 from pathlib import Path
 
 try:
@@ -33,6 +37,12 @@ try:
 except ImportError:
     HAS_NUMPY = False
 
+try:
+    from scipy.fft import rfft, next_fast_len
+    HAS_SCIPY = True
+except ImportError:
+    HAS_SCIPY = False
+
 try:
     import matplotlib.pyplot as plt
     HAS_MATPLOTLIB = True
@@ -40,7 +50,7 @@ except ImportError:
     HAS_MATPLOTLIB = False
 
 
-def load_wav(filepath: str) -> tuple[list[float], int]:
+def load_wav(filepath: str) -> tuple[np.ndarray, int]:
     """Load a WAV file and return samples as floats in [-1, 1] range."""
     with wave.open(filepath, 'rb') as wav:
         n_channels = wav.getnchannels()
@@ -50,26 +60,31 @@ def load_wav(filepath: str) -> tuple[list[float], int]:
 
         raw_data = wav.readframes(n_frames)
 
-        # Convert to samples
         if sample_width == 1:
-            fmt = f'{n_frames * n_channels}B'
-            samples = struct.unpack(fmt, raw_data)
-            samples = [(s - 128) / 128.0 for s in samples]
+            raw = np.frombuffer(raw_data, dtype=np.uint8)
+            offset, scale = 128, 1 / 128.0
         elif sample_width == 2:
-            fmt = f'{n_frames * n_channels}h'
-            samples = struct.unpack(fmt, raw_data)
-            samples = [s / 32768.0 for s in samples]
+            raw = np.frombuffer(raw_data, dtype='<i2')
+            offset, scale = 0, 1 / 32768.0
         else:
             raise ValueError(f"Unsupported sample width: {sample_width}")
 
-        # Convert stereo to mono by averaging channels
+        # Convert stereo to mono by summing the channels as integers and
+        # scaling once, so only the mono signal is converted to float
         if n_channels == 2:
-            samples = [(samples[i] + samples[i + 1]) / 2 for i in range(0, len(samples), 2)]
+            samples = raw.reshape(-1, 2).sum(axis=1, dtype=np.int32).astype(np.float32)
+            offset, scale = 2 * offset, scale / 2
+        else:
+            samples = raw.astype(np.float32)
+
+        if offset:
+            samples -= offset
+        samples *= scale
 
         return samples, sample_rate
 
 
-def analyze_with_psm(samples: list[float], sample_rate: int) -> dict:
+def analyze_with_psm(samples: np.ndarray, sample_rate: int) -> dict:
     """Analyze audio using Kino library."""
     if not HAS_PSM:
         raise RuntimeError("kino is not installed")
@@ -91,85 +106,86 @@ def analyze_with_psm(samples: list[float], sample_rate: int) -> dict:
     }
 
 
-def analyze_fallback(samples: list[float], sample_rate: int, fft_size: int = 4096) -> dict:
-    """Fallback analysis using pure Python/NumPy."""
-    import math
+# Frequency bands reported by the fallback analyzer: (name, low Hz, high Hz)
+BANDS = [
+    ('sub_bass', 20, 60),
+    ('bass', 60, 250),
+    ('low_mid', 250, 500),
+    ('mid', 500, 2000),
+    ('high_mid', 2000, 4000),
+    ('high', 4000, 20000),
+]
+
+# The bands are contiguous, so they are fully described by their edges
+BAND_EDGES = [low for _, low, _ in BANDS] + [BANDS[-1][2]]
+
+
+@functools.lru_cache(maxsize=8)
+def _hann(n: int):
+    """Symmetric float32 Hann window of length n, cached and read-only."""
+    window = (0.5 * (1 - np.cos(2 * np.pi * np.arange(n) / (n - 1)))).astype(np.float32)
+    window.flags.writeable = False
+    return window
+
+
+def analyze_fallback(samples: np.ndarray, sample_rate: int, fft_size: int = 4096) -> dict:
+    """Fallback analysis using NumPy."""
+    if not HAS_NUMPY:
+        raise RuntimeError("numpy is not installed")
 
     n = min(fft_size, len(samples))
 
-    # Apply Hann window
-    windowed = []
-    for i in range(n):
-        window = 0.5 * (1 - math.cos(2 * math.pi * i / (n - 1)))
-        windowed.append(samples[i] * window)
-
-    # Simple DFT
-    spectrum = []
-    for k in range(n // 2):
-        real = 0.0
-        imag = 0.0
-        for i, sample in enumerate(windowed):
-            angle = 2 * math.pi * k * i / n
-            real += sample * math.cos(angle)
-            imag -= sample * math.sin(angle)
-        magnitude = math.sqrt(real * real + imag * imag) * 2 / n
-        spectrum.append(magnitude)
-
-    freq_resolution = sample_rate / fft_size
-
-    # Compute centroid
-    weighted_sum = sum(m * (i * freq_resolution) for i, m in enumerate(spectrum))
-    total = sum(spectrum)
-    centroid = weighted_sum / total if total > 0 else 0
-
-    # Compute rolloff (95%)
-    target = sum(spectrum) * 0.95
-    cumulative = 0
-    rolloff = 0
-    for i, m in enumerate(spectrum):
-        cumulative += m
-        if cumulative >= target:
-            rolloff = i * freq_resolution
-            break
-
-    # Compute flatness
+    # Apply Hann window and take the magnitude spectrum (DC up to, not including,
+    # Nyquist). Short inputs are zero-padded to a fast transform length no
+    # smaller than fft_size, so bins line up with freq_resolution.
+    x = np.asarray(samples[:n], dtype=np.float32)
+    w = _hann(n)
+    if HAS_SCIPY:
+        nfft = next_fast_len(fft_size, real=True)
+        spectrum = np.abs(rfft(x * w, n=nfft))[:nfft // 2] * (2.0 / n)
+    else:
+        nfft = fft_size
+        spectrum = np.abs(np.fft.rfft(x * w, n=nfft))[:nfft // 2] * (2.0 / n)
+
+    freq_resolution = sample_rate / nfft
+
+    freqs = np.arange(len(spectrum)) * freq_resolution
+
+    # Compute centroid and rolloff (95%) from one cumulative sum
+    cumulative = np.cumsum(spectrum, dtype=np.float64)
+    total = cumulative[-1]
+    centroid = float((spectrum * freqs).sum() / total) if total > 0 else 0.0
+    rolloff = float(freqs[np.searchsorted(cumulative, total * 0.95)])
+
+    # Compute flatness: geometric mean taken in the log domain over arithmetic mean
     n_bins = len(spectrum)
-    log_sum = sum(math.log(m + 1e-10) for m in spectrum)
-    geometric_mean = math.exp(log_sum / n_bins)
-    arithmetic_mean = sum(spectrum) / n_bins
-    flatness = geometric_mean / arithmetic_mean if arithmetic_mean > 0 else 0
+    geometric_mean = np.exp(np.log(spectrum + 1e-10).sum() / n_bins)
+    arithmetic_mean = spectrum.mean()
+    flatness = float(geometric_mean / arithmetic_mean) if arithmetic_mean > 0 else 0.0
 
-    # Find dominant frequencies
-    indexed = [(i, m) for i, m in enumerate(spectrum)]
-    indexed.sort(key=lambda x: x[1], reverse=True)
-    max_mag = indexed[0][1] if indexed else 1
+    # Find dominant frequencies: select the top 10 bins, then order just those
+    top_k = min(10, len(spectrum))
+    idx = np.argpartition(spectrum, len(spectrum) - top_k)[len(spectrum) - top_k:]
+    idx = idx[np.argsort(-spectrum[idx], kind='stable')]
+    max_mag = spectrum[idx[0]] if top_k else 1
 
     dominant = []
-    for rank, (idx, mag) in enumerate(indexed[:10]):
+    for rank, (i, mag) in enumerate(zip(idx.tolist(), (spectrum[idx] / max_mag).tolist())):
         dominant.append({
-            'frequency_hz': idx * freq_resolution,
-            'magnitude': mag / max_mag,
+            'frequency_hz': i * freq_resolution,
+            'magnitude': mag,
             'rank': rank + 1,
         })
 
-    # Compute band energies
-    bands = [
-        ('sub_bass', 20, 60),
-        ('bass', 60, 250),
-        ('low_mid', 250, 500),
-        ('mid', 500, 2000),
-        ('high_mid', 2000, 4000),
-        ('high', 4000, 20000),
-    ]
-
-    band_energies = {}
-    for name, low, high in bands:
-        energy = 0
-        for i, m in enumerate(spectrum):
-            freq = i * freq_resolution
-            if low <= freq < high:
-                energy += m
-        band_energies[name] = energy
+    # Compute band energies in one segmented sum over the band edge bins.
+    # Bands with no bins (e.g. above Nyquist) stay at zero.
+    edges = np.searchsorted(freqs, BAND_EDGES)
+    nonempty = edges[1:] > edges[:-1]
+    energies = np.zeros(len(BANDS))
+    if nonempty.any():
+        energies[nonempty] = np.add.reduceat(spectrum[:edges[-1]], edges[:-1][nonempty])
+
+    band_energies = {name: float(energy) for (name, _, _), energy in zip(BANDS, energies)}
 
     # Normalize
     total_band = sum(band_energies.values())
@@ -186,36 +202,25 @@ def analyze_fallback(samples: list[float], sample_rate: int, fft_size: int = 409
     }
 
 
-def generate_fingerprint(samples: list[float], sample_rate: int) -> str:
+def generate_fingerprint(samples: np.ndarray, sample_rate: int) -> str:
     """Generate a simple audio fingerprint."""
-    import hashlib
-
     fft_size = 4096
     hop_size = 2048
-    hash_data = []
-
-    num_frames = (len(samples) - fft_size) // hop_size + 1
 
-    for frame_idx in range(min(num_frames, 100)):
-        start = frame_idx * hop_size
-        frame = samples[start:start + fft_size]
+    if len(samples) >= fft_size:
+        # Non-copying view of up to 100 frames; energies accumulate in float64
+        arr = np.asarray(samples, dtype=np.float64)
+        frames = np.lib.stride_tricks.sliding_window_view(arr, fft_size)[::hop_size][:100]
+        energies = np.einsum('ij,ij->i', frames, frames)
+        hash_data = (np.floor(energies * 255).astype(np.int64) % 256).astype(np.uint8).tobytes()
 
-        if len(frame) < fft_size:
-            break
-
-        # Calculate frame energy
-        energy = sum(s * s for s in frame)
-        hash_data.append(int(energy * 255) % 256)
-
-    # Create hash
-    if hash_data:
-        data_bytes = bytes(hash_data)
-        return hashlib.sha256(data_bytes).hexdigest()[:32]
+        # Create hash
+        return hashlib.blake2b(hash_data, digest_size=16).hexdigest()
 
     return ""
 
 
-def plot_analysis(samples: list[float], result: dict, sample_rate: int):
+def plot_analysis(samples: np.ndarray, result: dict, sample_rate: int):
     """Plot the analysis results."""
     if not HAS_MATPLOTLIB:
         print("matplotlib not installed. Cannot plot.")
@@ -226,8 +231,9 @@ def plot_analysis(samples: list[float], result: dict, sample_rate: int):
 
     # Waveform
     ax = axes[0, 0]
-    time = [i / sample_rate for i in range(len(samples[:sample_rate]))]
-    ax.plot(time, samples[:sample_rate], color='#9333EA', linewidth=0.5)
+    head = np.asarray(samples[:sample_rate])
+    time = np.arange(len(head)) / sample_rate
+    ax.plot(time, head, color='#9333EA', linewidth=0.5)
     ax.set_xlabel('Time (s)')
     ax.set_ylabel('Amplitude')
     ax.set_title('Waveform (first second)')
@@ -236,8 +242,9 @@ def plot_analysis(samples: list[float], result: dict, sample_rate: int):
     # Spectrum
     ax = axes[0, 1]
     if 'spectrum' in result:
-        freqs = [i * sample_rate / (len(result['spectrum']) * 2) for i in range(len(result['spectrum']))]
-        ax.plot(freqs[:1000], result['spectrum'][:1000], color='#7C3AED', linewidth=0.8)
+        spectrum = np.asarray(result['spectrum'])
+        freqs = np.arange(len(spectrum)) * (sample_rate / (2 * len(spectrum)))
+        ax.plot(freqs[:1000], spectrum[:1000], color='#7C3AED', linewidth=0.8)
     ax.axvline(x=result['spectral_centroid'], color='red', linestyle='--', label=f"Centroid: {result['spectral_centroid']:.0f} Hz")
     ax.axvline(x=result['spectral_rolloff'], color='orange', linestyle='--', label=f"Rolloff: {result['spectral_rolloff']:.0f} Hz")
     ax.set_xlabel('Frequency (Hz)')
@@ -274,6 +281,13 @@ def plot_analysis(samples: list[float], result: dict, sample_rate: int):
     plt.show()
 
 
+def json_default(obj):
+    """Serialize NumPy arrays and scalars in analysis results."""
+    if HAS_NUMPY and isinstance(obj, (np.ndarray, np.generic)):
+        return obj.tolist()
+    return str(obj)
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='Analyze audio files using Kino frequency analysis'
@@ -291,6 +305,10 @@ def main():
         print(f"Error: File not found: {args.input}")
         sys.exit(1)
 
+    if not HAS_NUMPY:
+        print("Error: numpy is required (pip install numpy)")
+        sys.exit(1)
+
     if not input_path.suffix.lower() == '.wav':
         print("Warning: Only WAV files are fully supported")
 
@@ -309,8 +327,7 @@ def main():
 
     # Print results
     if args.json:
-        import json
-        print(json.dumps(result, indent=2, default=str))
+        print(json.dumps(result, indent=2, default=json_default))
     else:
         print("\n=== Analysis Results ===")
         print(f"Spectral Centroid: {result['spectral_centroid']:.2f} Hz")